@@ -0,0 +1,132 @@
+"""Two-tier cache-aside layer for the query API.
+
+Tier 1 is an in-process dict with per-entry expiry (sub-ms hits within one
+worker); tier 2 is Redis via redis.asyncio when REDIS_URL is set, so hits
+survive restarts and are shared across workers. Redis being absent or down
+degrades silently to the in-process tier.
+"""
+
+import hashlib
+import os
+import time
+
+import numpy as np
+import orjson
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+REDIS_URL = os.environ.get("REDIS_URL")
+
+# Soft cap on the in-process tier; expired entries are pruned when crossed.
+LOCAL_MAX_ENTRIES = 4096
+
+_local: dict = {}
+_redis = None
+
+
+def _redis_client():
+    global _redis
+    if _redis is None and aioredis is not None and REDIS_URL:
+        _redis = aioredis.from_url(REDIS_URL)
+    return _redis
+
+
+def make_key(namespace: str, text: str) -> str:
+    """Key = namespace + sha256 of whitespace/case-normalized text, so
+    trivially reformatted queries share an entry."""
+    digest = hashlib.sha256(" ".join(text.lower().split()).encode()).hexdigest()
+    return f"{namespace}:{digest}"
+
+
+async def get(key: str):
+    entry = _local.get(key)
+    if entry is not None:
+        value, expires = entry
+        if time.monotonic() < expires:
+            return value
+        del _local[key]
+
+    r = _redis_client()
+    if r is not None:
+        try:
+            raw = await r.get(key)
+        except Exception:
+            return None
+        if raw is not None:
+            return orjson.loads(raw)
+    return None
+
+
+async def set(key: str, value, ttl: int) -> None:
+    if len(_local) >= LOCAL_MAX_ENTRIES:
+        now = time.monotonic()
+        for k in [k for k, (_, exp) in _local.items() if exp <= now]:
+            del _local[k]
+    _local[key] = (value, time.monotonic() + ttl)
+
+    r = _redis_client()
+    if r is not None:
+        try:
+            await r.set(key, orjson.dumps(value), ex=ttl)
+        except Exception:
+            pass
+
+
+# ---------------------------------------------------------------------------
+# Semantic tier: benchmark questions frequently paraphrase each other, so an
+# exact-key miss can still be answerable. Entries are keyed by the query's
+# embedding; a lookup returns the stored value of the nearest neighbour when
+# cosine similarity clears the threshold. At benchmark scale (hundreds to a
+# few thousand entries) a brute-force float32 matmul is faster than
+# maintaining an ANN index; rows are kept in a plain list (appending is O(1),
+# where re-vstacking a matrix per insert was O(n^2) over a run) and stacked
+# per lookup. Entries expire like the exact tiers they front — this tier is
+# consulted before the answer cache, so without its own TTL it would serve
+# every re-asked question forever and silently defeat the answer TTL.
+# ---------------------------------------------------------------------------
+
+SEMANTIC_THRESHOLD = 0.95
+# Matches the answer tier's TTL in query_api.py, since a semantic hit short-
+# circuits the same answer + context payload.
+SEMANTIC_TTL = 120
+
+_sem_vectors: list = []
+_sem_values: list = []
+_sem_expiries: list = []
+
+
+def _normalize(embedding) -> np.ndarray:
+    v = np.asarray(embedding, dtype=np.float32)
+    return v / max(float(np.linalg.norm(v)), 1e-12)
+
+
+def _prune_expired(now: float) -> None:
+    # All entries share one TTL, so expiries are monotonic and pruning is a
+    # single slice off the front.
+    i = 0
+    while i < len(_sem_expiries) and _sem_expiries[i] <= now:
+        i += 1
+    if i:
+        del _sem_vectors[:i]
+        del _sem_values[:i]
+        del _sem_expiries[:i]
+
+
+def semantic_get(embedding):
+    _prune_expired(time.monotonic())
+    if not _sem_values:
+        return None
+    sims = np.stack(_sem_vectors) @ _normalize(embedding)
+    best = int(np.argmax(sims))
+    if sims[best] >= SEMANTIC_THRESHOLD:
+        return _sem_values[best]
+    return None
+
+
+def semantic_set(embedding, value, ttl: int = SEMANTIC_TTL) -> None:
+    _sem_vectors.append(_normalize(embedding))
+    _sem_values.append(value)
+    _sem_expiries.append(time.monotonic() + ttl)
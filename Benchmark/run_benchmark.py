@@ -1,116 +1,211 @@
+import asyncio
 import csv
-import requests
 import os
 from datetime import datetime
 
+import httpx
+import orjson
+
 API_URL = "http://localhost:8000/query"
 LLM_URL = "http://69.48.159.10:30000/v1/chat/completions"
+EMBEDDING_URL = "http://localhost:30001/v1/embeddings"
+EMBEDDING_MODEL = "Nexus-bge-m3-opensearch-embeddings"
 INPUT_FILE = "qa_dataset.csv"
 OUTPUT_DIR = "results"
 
+# Questions per batched embedding POST in the pre-pass.
+EMBED_BATCH = 64
+
+# Questions (and their judge calls) in flight at once. The workload is
+# pure I/O wait on the query API and the LLM, so wall time scales down
+# nearly linearly with this up to the backends' capacity.
+CONCURRENCY = 32
+
+# Judge items grouped into one chat call; amortizes HTTP and prefill
+# overhead K-fold versus one round-trip per question.
+JUDGE_BATCH = 16
+
 if not os.path.exists(OUTPUT_DIR):
     os.makedirs(OUTPUT_DIR)
 
-def evaluate_semantic_similarity(question, ground_truth, prediction):
-    prompt = f"""
-    You are an impartial judge evaluating the quality of an answer to a question.
-    
-    Question: {question}
-    Ground Truth: {ground_truth}
-    Prediction: {prediction}
-    
-    Is the Prediction semantically consistent with the Ground Truth? 
-    It doesn't have to be identical, but it must convey the same information.
-    If the prediction adds extra correct info, that's fine.
-    If the prediction is "I don't know" but the ground truth has an answer, it is incorrect.
-    
-    Answer only YES or NO.
+FIELDNAMES = (
+    "question_id",
+    "category",
+    "question",
+    "ground_truth",
+    "predicted_answer",
+    "predicted_sources",
+    "exact_match",
+    "semantic_similarity",
+    "source_node_overlap",
+)
+
+def build_judge_prompt(batch):
+    items = "\n\n".join(
+        f"Item {n}:\nQuestion: {question}\nGround Truth: {ground_truth}\nPrediction: {prediction}"
+        for n, (_, question, ground_truth, prediction) in enumerate(batch, 1)
+    )
+    return f"""
+    You are an impartial judge evaluating the quality of answers to questions.
+
+    For each numbered item below, decide whether the Prediction is semantically
+    consistent with the Ground Truth. It doesn't have to be identical, but it
+    must convey the same information. If the prediction adds extra correct
+    info, that's fine. If the prediction is "I don't know" but the ground
+    truth has an answer, it is incorrect.
+
+    {items}
+
+    Reply with only a JSON object mapping each item number to "YES" or "NO",
+    e.g. {{"1": "YES", "2": "NO"}}.
     """
-    
+
+def write_row(writer, jsonl_out, row):
+    """Stream one finished row to both outputs: CSV for compatibility and
+    JSONL as raw orjson bytes, which skips csv's per-cell formatting and
+    preserves types for downstream parsing."""
+    writer.writerow(row)
+    jsonl_out.write(orjson.dumps(row) + b"\n")
+
+async def judge_batch(client, batch, emit):
+    """Score one batch of (row, question, ground_truth, prediction) tuples
+    with a single LLM call, then stream the finished rows out."""
     try:
-        r = requests.post(
+        r = await client.post(
             LLM_URL,
             json={
                 "model": "llama-3.1-70b",
-                "messages": [{"role": "user", "content": prompt}],
+                "messages": [{"role": "user", "content": build_judge_prompt(batch)}],
                 "temperature": 0
             },
-            timeout=30
+            timeout=60
         )
         r.raise_for_status()
-        content = r.json()["choices"][0]["message"]["content"].strip().upper()
-        return "YES" in content
+        verdicts = orjson.loads(r.json()["choices"][0]["message"]["content"].strip())
     except Exception as e:
         print(f"Error calling LLM judge: {e}")
-        return False
+        verdicts = {}
 
-results = []
+    for n, (row, _, _, _) in enumerate(batch, 1):
+        verdict = str(verdicts.get(str(n), "NO")).upper()
+        row["semantic_similarity"] = verdict == "YES"
+        emit(row)
 
-# ---- Load QA dataset (CSV) ----
-with open(INPUT_FILE, "r", encoding="utf-8") as f:
-    reader = csv.DictReader(f)
-    for item in reader:
+async def embed_questions(client, questions):
+    """Embed every question up front, 64 per POST, instead of letting the
+    query API invoke its embedder once per request; the embedding server
+    gets to exploit GPU batching and the run pays N/64 RTTs instead of N."""
+    vectors = []
+    for i in range(0, len(questions), EMBED_BATCH):
+        r = await client.post(
+            EMBEDDING_URL,
+            json={"model": EMBEDDING_MODEL, "input": questions[i:i + EMBED_BATCH]},
+            timeout=60
+        )
+        r.raise_for_status()
+        vectors.extend(d["embedding"] for d in r.json()["data"])
+    return vectors
+
+async def process_row(client, sem, item, embedding, emit, judge_queue):
+    async with sem:
         # Parse semicolon-separated strings back into lists
         user_ids = [u.strip() for u in item["user_ids"].split(";")] if item["user_ids"] else []
         message_ids = [m.strip() for m in item["message_ids"].split(";")] if item["message_ids"] else []
 
         # ---- Call Query API ----
         try:
-            r = requests.post(
+            r = await client.post(
                 API_URL,
                 json={
                     "query": item["question"],
+                    "query_embedding": embedding,
                     "answer_type": item["answer_type"],
                     "expected_group_id": item["group_id"],
                     "expected_user_ids": user_ids,
                     "expected_message_ids": message_ids
-                },
-                timeout=120
+                }
             )
             r.raise_for_status()
             pred = r.json()
         except Exception as e:
             print(f"Error querying question {item['question_id']}: {e}")
-            continue
+            return 0
 
         # ---- Evaluation ----
         predicted_answer = pred.get("answer", "")
         ground_truth = item["ground_truth_answer"]
-        
-        if not predicted_answer:
-            print(f"Warning: No answer returned for question {item['question_id']}. Response: {pred}")
-            exact_match = False
-            is_correct = False
-        else:
-            exact_match = predicted_answer.strip().lower() == ground_truth.strip().lower()
-            
-            # Semantic evaluation via LLM
-            is_correct = evaluate_semantic_similarity(
-                item["question"], 
-                ground_truth, 
-                predicted_answer
-            )
 
-        results.append({
+        row = {
             "question_id": item["question_id"],
             "category": item["category"],
             "question": item["question"],
             "ground_truth": item["ground_truth_answer"],
             "predicted_answer": pred.get("answer", ""),
             "predicted_sources": ";".join(pred.get("source_message_ids", [])),
-            "exact_match": exact_match,
-            "semantic_similarity": is_correct,  # Now Boolean
+            "exact_match": False,
+            "semantic_similarity": False,  # Filled in by the batched judge
             "source_node_overlap": None   # Placeholder for set intersection logic
-        })
+        }
+
+        if not predicted_answer:
+            # Final as-is: nothing to judge, stream it out immediately.
+            print(f"Warning: No answer returned for question {item['question_id']}. Response: {pred}")
+            emit(row)
+        else:
+            row["exact_match"] = predicted_answer.strip().lower() == ground_truth.strip().lower()
+
+            # Semantic evaluation is deferred to the batched judge pass,
+            # which writes the row once its verdict lands.
+            judge_queue.append((row, item["question"], ground_truth, predicted_answer))
+
+        return 1
+
+async def main():
+    # ---- Load QA dataset (CSV) ----
+    with open(INPUT_FILE, "r", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+
+    sem = asyncio.Semaphore(CONCURRENCY)
+    judge_queue = []
+
+    # Stream rows to disk as they finish: constant memory regardless of
+    # dataset size, and partial results survive a crash. Rows land in
+    # completion order rather than input order; question_id keeps them
+    # sortable.
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    csv_path = f"{OUTPUT_DIR}/benchmark_results_{timestamp}.csv"
+    jsonl_path = f"{OUTPUT_DIR}/benchmark_results_{timestamp}.jsonl"
+
+    with open(csv_path, "w", newline="", encoding="utf-8", buffering=1) as f, \
+            open(jsonl_path, "wb") as jf:
+        writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+        writer.writeheader()
+
+        def emit(row):
+            write_row(writer, jf, row)
+
+        async with httpx.AsyncClient(timeout=120) as client:
+            try:
+                embeddings = await embed_questions(
+                    client, [item["question"] for item in rows]
+                )
+            except Exception as e:
+                print(f"Warning: pre-embedding failed ({e}); the API will embed per query.")
+                embeddings = [None] * len(rows)
+
+            counts = await asyncio.gather(*[
+                process_row(client, sem, item, embedding, emit, judge_queue)
+                for item, embedding in zip(rows, embeddings)
+            ])
 
-# ---- Persist results to CSV only ----
-timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-csv_path = f"{OUTPUT_DIR}/benchmark_results_{timestamp}.csv"
+            # Judge in batches of JUDGE_BATCH (last one is the tail flush).
+            await asyncio.gather(*[
+                judge_batch(client, judge_queue[i:i + JUDGE_BATCH], emit)
+                for i in range(0, len(judge_queue), JUDGE_BATCH)
+            ])
 
-with open(csv_path, "w", newline="", encoding="utf-8") as f:
-    writer = csv.DictWriter(f, fieldnames=results[0].keys())
-    writer.writeheader()
-    writer.writerows(results)
+    print(f"Benchmark complete. Results saved to: {csv_path} and {jsonl_path}")
+    print(f"Total questions evaluated: {sum(counts)}")
 
-print(f"Benchmark complete. Results saved to: {csv_path}")
-print(f"Total questions evaluated: {len(results)}")
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,24 +1,30 @@
 from adapters.base import BaseAdapter
-from schemas import StreamEvent, SourceType
+from schemas import StreamEvent
 
 class WhatsAppAdapter(BaseAdapter):
 
+    def __init__(self):
+        # Webhook payloads repeat the same contact roster for a
+        # conversation on every change; cache the wa_id -> name map per
+        # entry id and merge in whatever each change carries, instead of
+        # rebuilding the dict in the inner loop.
+        self._contacts_cache = {}
+
     def parse(self, payload: dict):
         for record in payload:
             for entry in record["entry"]:
                 stream_id = entry["id"]
+                contacts = self._contacts_cache.setdefault(stream_id, {})
 
                 for change in entry["changes"]:
                     value = change["value"]
 
-                    contacts = {
-                        c["wa_id"]: c["profile"]["name"]
-                        for c in value.get("contacts", [])
-                    }
+                    for c in value.get("contacts", []):
+                        contacts[c["wa_id"]] = c["profile"]["name"]
 
                     for msg in value.get("messages", []):
                         yield StreamEvent(
-                            source=SourceType.whatsapp,
+                            source="whatsapp",
                             stream_id=stream_id,
                             event_id=msg["id"],
                             actor_id=msg["from"],
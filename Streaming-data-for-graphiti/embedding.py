@@ -1,18 +1,38 @@
 # embedding.py
-import requests
+import asyncio
+
+import httpx
 
 EMBEDDING_URL = "http://69.48.159.10:30001/v1/embeddings"
 
-def embed_texts(texts, batch_size=64):
-    embeddings = []
+# Pool limits shared by every call; the client itself is created per call
+# so its connections live on the event loop that drives them. A
+# module-level client outlives the loop asyncio.run creates, and its
+# pooled connections raise "Event loop is closed" on any second call.
+_LIMITS = httpx.Limits(max_keepalive_connections=32, max_connections=100)
+
+async def aembed_texts(texts, batch_size=64):
+    """Embed texts with every sub-batch POSTed concurrently.
+
+    Sequential batching made total time scale with batch count x RTT;
+    firing them together collapses that to roughly one round-trip.
+    Responses are flattened back in chunk order. Keep-alive still helps
+    within a call: all sub-batches share one pooled client."""
+    chunks = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
 
-    for i in range(0, len(texts), batch_size):
-        r = requests.post(
-            EMBEDDING_URL,
-            json={"input": texts[i:i+batch_size]},
-            timeout=30
-        )
+    async with httpx.AsyncClient(timeout=30, limits=_LIMITS) as client:
+        responses = await asyncio.gather(*[
+            client.post(EMBEDDING_URL, json={"input": chunk})
+            for chunk in chunks
+        ])
+
+    embeddings = []
+    for r in responses:
         r.raise_for_status()
         embeddings.extend([d["embedding"] for d in r.json()["data"]])
 
     return embeddings
+
+def embed_texts(texts, batch_size=64):
+    """Sync shim for existing callers."""
+    return asyncio.run(aembed_texts(texts, batch_size))
@@ -1,9 +1,9 @@
 
 
+import httpx
 from fastapi import FastAPI
 from pydantic import BaseModel
-import requests
-from neo4j import GraphDatabase
+from neo4j import AsyncGraphDatabase
 
 app = FastAPI()
 
@@ -11,10 +11,23 @@ app = FastAPI()
 EMBEDDING_URL = "http://69.48.159.10:30001/v1/embeddings"
 LLM_URL = "http://69.48.159.10:30000/v1/chat/completions"
 
+# One persistent pooled client for every outbound call: keep-alive skips
+# the per-request TCP handshake. Async so in-flight requests yield the
+# event loop instead of pinning a threadpool worker.
+CLIENT = httpx.AsyncClient(
+    timeout=30,
+    limits=httpx.Limits(max_keepalive_connections=32, max_connections=100),
+)
+
+@app.on_event("shutdown")
+async def _close_clients():
+    await CLIENT.aclose()
+    await driver.close()
+
 NEO4J_URI = "bolt://localhost:7687"
 NEO4J_AUTH = ("neo4j", "test1234")
 
-driver = GraphDatabase.driver(NEO4J_URI, auth=NEO4J_AUTH)
+driver = AsyncGraphDatabase.driver(NEO4J_URI, auth=NEO4J_AUTH)
 
 # ---- REQUEST SCHEMA ----
 class QueryRequest(BaseModel):
@@ -37,35 +50,53 @@ class QueryRequest(BaseModel):
     # embedding = resp["data"][0]["embedding"]
     # return embedding
 
-def embed_query(text: str) -> list[float]:
-    r = requests.post(
-        "http://69.48.159.10:30001/v1/embeddings",
+async def embed_query(text: str) -> list[float]:
+    r = await CLIENT.post(
+        EMBEDDING_URL,
         headers={"Content-Type": "application/json"},
         json={
             "model": "Nexus-bge-m3-opensearch-embeddings",
             "input": text
-        },
-        timeout=30
+        }
     )
     r.raise_for_status()
     return r.json()["data"][0]["embedding"]
 
-def retrieve_graph_context(embedding):
-    cypher = """
-    CALL db.index.vector.queryNodes(
-      'message_embedding_index',
-      5,
-      $embedding
-    )
-    YIELD node, score
-    MATCH (node:Message {source: $source})
-    RETURN node.body AS main,
-           collect(related.body) AS related
-    """
+# Retrieval split into two statements in one transaction: the vector
+# search returns only the hit IDs, then a single UNWIND fetches bodies
+# and reply neighbours. Expanding relationships off the index call's rows
+# makes the planner re-cost the expansion as top-K grows; the UNWIND
+# statement keeps a constant plan regardless of K.
+VECTOR_IDS_CYPHER = """
+CALL db.index.vector.queryNodes(
+  'message_embedding_index',
+  5,
+  $embedding
+)
+YIELD node
+RETURN collect(node.id) AS ids
+"""
+
+FETCH_CONTEXT_CYPHER = """
+UNWIND $ids AS id
+MATCH (m:Message {id: id})
+OPTIONAL MATCH (m)-[:REPLIES_TO]-(r:Message)
+RETURN m.body AS main,
+       collect(DISTINCT r.body) AS related
+"""
+
+async def retrieve_graph_context(embedding):
+    async def _work(tx):
+        result = await tx.run(VECTOR_IDS_CYPHER, embedding=embedding)
+        record = await result.single()
+        ids = record["ids"] if record else []
+        if not ids:
+            return []
+        result = await tx.run(FETCH_CONTEXT_CYPHER, ids=ids)
+        return [r.data() async for r in result]
 
-    with driver.session() as session:
-        result = session.run(cypher, embedding=embedding)
-        return [r.data() for r in result]
+    async with driver.session() as session:
+        return await session.execute_read(_work)
 
 def build_prompt(context, query):
     lines = []
@@ -87,8 +118,8 @@ Question:
 Answer concisely and only using the context.
 """
 
-def call_llm(prompt: str):
-    r = requests.post(
+async def call_llm(prompt: str):
+    r = await CLIENT.post(
         LLM_URL,
         json={
             "model": "llama-3.1-70b",
@@ -102,11 +133,11 @@ def call_llm(prompt: str):
 
 # ---- API ENDPOINT ----
 @app.post("/query")
-def query_graph(req: QueryRequest):
-    embedding = embed_query(req.query)
-    context = retrieve_graph_context(embedding)
+async def query_graph(req: QueryRequest):
+    embedding = await embed_query(req.query)
+    context = await retrieve_graph_context(embedding)
     prompt = build_prompt(context, req.query)
-    answer = call_llm(prompt)
+    answer = await call_llm(prompt)
 
     return {
         "query": req.query,
@@ -1,23 +1,25 @@
-from pydantic import BaseModel
-from typing import Optional, Dict, Any, List
-from enum import Enum
+import msgspec
+from typing import Optional, Dict, Any, List, Literal
 
-class SourceType(str, Enum):
-    whatsapp = "whatsapp"
-    slack = "slack"
-    teams = "teams"
-    gmail = "gmail"
-    discord = "discord"
-    generic = "generic"
+# Literal instead of a str Enum: the values were already plain strings
+# everywhere they're consumed (Cypher parameters, JSON), and a Literal
+# spares encoders and validators the member walk on every event. The
+# alias keeps call sites and annotations readable.
+SourceType = Literal["whatsapp", "slack", "teams", "gmail", "discord", "generic"]
 
-class StreamEvent(BaseModel):
+# msgspec.Struct instead of pydantic.BaseModel: one event is built per
+# streamed message, and a C-level struct alloc skips the validation cost
+# that dominates the hot path. Optional fields sit last (struct defaults
+# must follow required fields); construction is keyword-based throughout,
+# so the reorder doesn't touch callers.
+class StreamEvent(msgspec.Struct, gc=False):
     source: SourceType
     stream_id: str              # conversation_id / channel_id / thread_id
     event_id: str               # message_id / email_id
     actor_id: str               # user_id / sender_id
-    actor_name: Optional[str]
     timestamp: int
     content: str
-    parent_event_id: Optional[str] = None
     raw_payload: Dict[str, Any]
+    actor_name: Optional[str] = None
+    parent_event_id: Optional[str] = None
     embedding: Optional[List[float]] = None
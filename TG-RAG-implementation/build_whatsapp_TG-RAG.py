@@ -1,12 +1,25 @@
 import os
 import sys
-import json
 import argparse
 import logging
 from pathlib import Path
 from typing import List, Dict
 from dotenv import load_dotenv
-from datetime import datetime
+from datetime import datetime, timezone
+from functools import lru_cache
+
+import ijson
+
+UTC = timezone.utc
+
+
+@lru_cache(maxsize=4096)
+def iso(ts: int) -> str:
+    """Epoch seconds -> ISO string. WhatsApp dumps repeat timestamps
+    heavily within a group, so most calls are cache hits that skip the
+    datetime construction and formatting. fromtimestamp(ts, UTC) also
+    replaces the deprecated utcfromtimestamp."""
+    return datetime.fromtimestamp(ts, UTC).isoformat()
 
 # -----------------------------------------------------------------------------
 # Logging
@@ -37,52 +50,66 @@ def load_whatsapp_messages(path: Path) -> List[Dict]:
     if not path.exists():
         raise FileNotFoundError(f"WhatsApp file not found: {path}")
 
-    with open(path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
     documents = []
 
-    for obj in data:
-        for entry in obj.get("entry", []):
-            group_id = entry.get("id", "unknown-group")
+    # Stream the top-level array with ijson instead of json.load: only one
+    # webhook record is materialized at a time, so peak memory is bound by
+    # the largest entry rather than the whole corpus plus its parse tree.
+    with open(path, "rb") as f:
+        for obj in ijson.items(f, "item", use_float=True):
+            _collect_documents(obj, documents)
 
-            for change in entry.get("changes", []):
-                value = change.get("value", {})
-                messages = value.get("messages", [])
-                contacts = value.get("contacts", [])
+    # Lazy %-style args: the logger formats only if the level is enabled.
+    logging.info("Loaded %d WhatsApp messages", len(documents))
+    return documents
 
-                contact_map = {
-                    c["wa_id"]: c.get("profile", {}).get("name", c["wa_id"])
-                    for c in contacts
-                }
 
-                for msg in messages:
-                    text = msg.get("text", {}).get("body")
-                    if not text:
-                        continue
-
-                    sender_id = msg.get("from")
-                    sender_name = contact_map.get(sender_id, sender_id)
-
-                    ts = int(msg.get("timestamp", 0))
-                    timestamp = datetime.utcfromtimestamp(ts).isoformat() if ts else None
-
-                    documents.append({
-                        "title": f"WhatsApp | {group_id} | {sender_name}",
-                        "doc": text,
-                        "timestamp": timestamp,
-                        "metadata": {
-                            "group_id": group_id,
-                            "message_id": msg.get("id"),
-                            "sender_id": sender_id,
-                            "sender_name": sender_name,
-                            "parent_message_id": msg.get("parent_message_id"),
-                            "child_message_ids": msg.get("child_message_ids", [])
-                        }
-                    })
-
-    logging.info(f"Loaded {len(documents)} WhatsApp messages")
-    return documents
+def _collect_documents(obj: Dict, documents: List[Dict]) -> None:
+    for entry in obj.get("entry", []):
+        group_id = entry.get("id", "unknown-group")
+
+        for change in entry.get("changes", []):
+            value = change.get("value", {})
+
+            # Explicit conditional instead of chained .get with a {}
+            # default: no throwaway empty dict is allocated for contacts
+            # without a profile.
+            contact_map = {}
+            for c in value.get("contacts", []):
+                p = c.get("profile")
+                contact_map[c["wa_id"]] = p["name"] if p and "name" in p else c["wa_id"]
+
+            # Loop invariants hoisted to locals: the title prefix is
+            # formatted once per change instead of per message, and the
+            # bound contact_map.get skips an attribute lookup each row.
+            group_prefix = f"WhatsApp | {group_id} | "
+            cm_get = contact_map.get
+
+            # Single generator fed to extend instead of per-message appends:
+            # filtering, field extraction, and dict construction all run in
+            # one comprehension frame, cutting bytecode dispatch on this
+            # CPU-bound preprocessing loop. Walrus bindings keep each
+            # msg.get to one call.
+            documents.extend(
+                {
+                    "title": f"{group_prefix}{(sender_name := cm_get(sender_id, sender_id))}",
+                    "doc": text,
+                    "timestamp": (
+                        iso(ts) if (ts := int(msg.get("timestamp", 0))) else None
+                    ),
+                    "metadata": {
+                        "group_id": group_id,
+                        "message_id": msg.get("id"),
+                        "sender_id": sender_id,
+                        "sender_name": sender_name,
+                        "parent_message_id": msg.get("parent_message_id"),
+                        "child_message_ids": msg.get("child_message_ids", [])
+                    }
+                }
+                for msg in value.get("messages", [])
+                if (text := msg.get("text", {}).get("body"))
+                and ((sender_id := msg.get("from")) or True)
+            )
 
 # -----------------------------------------------------------------------------
 # Main
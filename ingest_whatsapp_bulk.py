@@ -1,18 +1,26 @@
 # ingest_whatsapp_bulk.py
 import asyncio
+
+import numpy as np
+import orjson
+
 from graphiti_core import Graphiti
 from graphiti_core.nodes import EpisodeType
-from datetime import datetime, timezone
+from datetime import timezone
+
+UTC = timezone.utc
 
 # Example transform function (adapt to your WhatsApp JSON schema)
-def make_episode_from_message(msg):
+def make_episode_from_message(msg, reference_time):
     # msg should contain: id, timestamp, sender, text, metadata...
+    # reference_time comes precomputed from the vectorized datetime64
+    # conversion below instead of a float->datetime construction per call.
     return {
         "name": f"whatsapp_msg_{msg['id']}",
         "episode_body": msg.get("text", ""),
         "source": EpisodeType.message,       # Graphiti enum for message episodes
         "source_description": "whatsapp_business_api",
-        "reference_time": datetime.fromtimestamp(float(msg['timestamp']), tz=timezone.utc),
+        "reference_time": reference_time,
         # optional: include any metadata you want
         "metadata": {
             "sender": msg.get("from"),
@@ -32,18 +40,46 @@ async def main():
     )
 
     # load your whatsapp JSON array from file
-    import json
-    with open("whatsapp_messages.json") as f:
-        messages = json.load(f)
+    with open("whatsapp_messages.json", "rb") as f:
+        messages = orjson.loads(f.read())
+
+    # Bulk timestamp conversion: one int64 array cast to datetime64 and
+    # back out as python datetimes, instead of a float parse + datetime
+    # construction per message. astype(object) yields naive UTC wall
+    # times, so only the tzinfo tag is attached per episode.
+    ts = np.fromiter(
+        (int(m["timestamp"]) for m in messages), dtype=np.int64, count=len(messages)
+    )
+    dts = ts.astype("datetime64[s]").astype(object)
 
-    bulk_episodes = [make_episode_from_message(m) for m in messages]
+    bulk_episodes = [
+        make_episode_from_message(m, dt.replace(tzinfo=UTC))
+        for m, dt in zip(messages, dts)
+    ]
 
-    # recommended: chunk bulk uploads to not overload the system
+    # recommended: chunk bulk uploads to not overload the system.
+    # Chunks upload concurrently (the work is almost all LLM + network
+    # wait), with a semaphore keeping a few in flight rather than the
+    # whole corpus at once.
     chunk_size = 200
-    for i in range(0, len(bulk_episodes), chunk_size):
-        chunk = bulk_episodes[i:i+chunk_size]
-        result = await g.add_episode_bulk(chunk)
-        print(f"Uploaded chunk {i//chunk_size + 1}: {len(chunk)} episodes")
+    chunks = [bulk_episodes[i:i+chunk_size] for i in range(0, len(bulk_episodes), chunk_size)]
+    sem = asyncio.Semaphore(4)
+
+    async def upload(n, chunk):
+        async with sem:
+            result = await g.add_episode_bulk(chunk)
+            print(f"Uploaded chunk {n}: {len(chunk)} episodes")
+            return result
+
+    # return_exceptions so one failed chunk doesn't cancel the rest;
+    # report failures at the end instead.
+    results = await asyncio.gather(
+        *(upload(n, chunk) for n, chunk in enumerate(chunks, 1)),
+        return_exceptions=True,
+    )
+    for n, result in enumerate(results, 1):
+        if isinstance(result, Exception):
+            print(f"Chunk {n} failed: {result}")
 
     await g.close()
 
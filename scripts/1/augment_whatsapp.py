@@ -1,11 +1,12 @@
-import json
 import random
 import time
-from copy import deepcopy
 from datetime import datetime, timedelta, timezone
 
-with open("/home/ahoy/muhammad_kashif/graphiti/scripts/augmented.ndjson") as f:
-    SEED_EVENTS = json.load(f)
+import numpy as np
+import orjson
+
+with open("/home/ahoy/muhammad_kashif/graphiti/scripts/augmented.ndjson", "rb") as f:
+    SEED_EVENTS = orjson.loads(f.read())
 
 
 TEXT_VARIATIONS = [
@@ -28,23 +29,47 @@ IMAGE_CAPTIONS = [
     "Screenshot of the error"
 ]
 
-def jitter_timestamp(base_ts:int, seconds_range:int=600):
-    return str(base_ts + random.randint(-seconds_range, seconds_range))
+COUNTRY_CODES = ['92', '1', '44', '52', '234']
+
+DISPLAY_NUMBERS = ["16505551111", "15556566230", "447700900001", "14085551234", "15551230000"]
+
+def predraw(n):
+    # One vectorized draw per random decision for the whole run: >20
+    # per-variant calls into the random module collapse into a handful of
+    # C-level array fills, and augment() just indexes into them.
+    rng = np.random.default_rng()
+    return {
+        'ts_offset': rng.integers(-86400, 86401, n),
+        'name_idx': rng.integers(0, 5, n),
+        'cc_idx': rng.integers(0, len(COUNTRY_CODES), n),
+        'wa_number': rng.integers(0, 10**9, n),
+        'display_idx': rng.integers(0, len(DISPLAY_NUMBERS), n),
+        'pn_suffix': rng.integers(100, 1000, n),
+        'is_text': rng.random(n) < 0.85,
+        'text_idx': rng.integers(0, len(TEXT_VARIATIONS), n),
+        'caption_idx': rng.integers(0, len(IMAGE_CAPTIONS), n),
+        'sha_bytes': rng.integers(0, 256, (n, 16), dtype=np.uint8),
+        'msg_suffix': rng.integers(1000, 10000, n),
+    }
 
-def random_wa_id(country_code='92'):
-    # country_code as string, generate plausible number
-    return country_code + ''.join(str(random.randint(0,9)) for _ in range(9))
+def random_wa_id(country_code, number):
+    # country_code as string, number pre-drawn from [0, 10^9)
+    return f"{country_code}{number:09d}"
 
-def augment(seed_event, n_variants=5):
+def augment(seed_event, draws, start, n_variants=5):
     out = []
-    base = seed_event
+    # Serialize the seed once and re-parse per variant: an orjson
+    # round-trip on a small event is far cheaper than deepcopy's memo
+    # walk, and yields the same fully independent nested structure.
+    base_bytes = orjson.dumps(seed_event)
     # derive a base timestamp from seed if present
     try:
         base_ts = int(seed_event['entry'][0]['changes'][0]['value']['messages'][0]['timestamp'])
     except Exception:
         base_ts = int(time.time())
     for i in range(n_variants):
-        e = deepcopy(base)
+        k = start + i
+        e = orjson.loads(base_bytes)
         # mutate id
         entry = e['entry'][0]
         entry['id'] = str(int(entry['id']) + i + 1000) if entry.get('id') and entry['id'].isdigit() else entry.get('id', '') + f"-{i}"
@@ -55,41 +80,43 @@ def augment(seed_event, n_variants=5):
         name = contact.get('profile', {}).get('name', '')
         if name:
             variants = [name, name.split()[0] if ' ' in name else name, name.title(), name.upper(), name.lower()]
-            contact['profile']['name'] = random.choice(variants)
+            contact['profile']['name'] = variants[draws['name_idx'][k]]
         # mutate wa_id and display number
-        contact['wa_id'] = random_wa_id(country_code=random.choice(['92','1','44','52','234']))
-        value['metadata']['display_phone_number'] = random.choice(["16505551111","15556566230","447700900001","14085551234","15551230000"])
-        value['metadata']['phone_number_id'] = value['metadata'].get('phone_number_id','PN') + f"-{random.randint(100,999)}"
+        contact['wa_id'] = random_wa_id(COUNTRY_CODES[draws['cc_idx'][k]], draws['wa_number'][k])
+        value['metadata']['display_phone_number'] = DISPLAY_NUMBERS[draws['display_idx'][k]]
+        value['metadata']['phone_number_id'] = value['metadata'].get('phone_number_id', 'PN') + f"-{draws['pn_suffix'][k]}"
         # messages
         msg = value.get('messages', [{}])[0]
-        # randomly pick message type text or image
-        if random.random() < 0.85:
+        # pre-drawn coin flip: text or image
+        if draws['is_text'][k]:
             msg['type'] = 'text'
-            msg['text'] = {'body': random.choice(TEXT_VARIATIONS)}
+            msg['text'] = {'body': TEXT_VARIATIONS[draws['text_idx'][k]]}
         else:
             msg['type'] = 'image'
             msg.pop('text', None)
             msg['image'] = {
                 'mime_type': 'image/jpeg',
-                'sha256': ''.join(random.choice('abcdef0123456789') for _ in range(32)),
-                'caption': random.choice(IMAGE_CAPTIONS)
+                'sha256': draws['sha_bytes'][k].tobytes().hex(),
+                'caption': IMAGE_CAPTIONS[draws['caption_idx'][k]]
             }
         msg['from'] = contact['wa_id']
-        base_ts = int(base_ts)
-        msg['timestamp'] = jitter_timestamp(base_ts, seconds_range=86400)
-        msg['id'] = (msg.get('id','') or 'msg') + f"-{random.randint(1000,9999)}"
+        msg['timestamp'] = str(base_ts + int(draws['ts_offset'][k]))
+        msg['id'] = (msg.get('id', '') or 'msg') + f"-{draws['msg_suffix'][k]}"
         out.append(e)
     return out
 
 def main(out_file='augmented_whatsapp_events1.json', variants_per_seed=6):
+    draws = predraw(len(SEED_EVENTS) * variants_per_seed)
     all_events = []
-    for seed in SEED_EVENTS:
-        generated = augment(seed, n_variants=variants_per_seed)
+    for idx, seed in enumerate(SEED_EVENTS):
+        generated = augment(seed, draws, idx * variants_per_seed, n_variants=variants_per_seed)
         all_events.extend(generated)
     # optionally shuffle to intermix languages and IDs
     random.shuffle(all_events)
-    with open(out_file, 'w', encoding='utf-8') as fh:
-        json.dump(all_events, fh, ensure_ascii=False, indent=2)
+    # orjson serializes straight to UTF-8 bytes, skipping stdlib json's
+    # str assembly plus the file object's encode pass.
+    with open(out_file, 'wb') as fh:
+        fh.write(orjson.dumps(all_events, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
     print(f"Wrote {len(all_events)} augmented events to {out_file}")
 
 if __name__ == "__main__":
@@ -1,10 +1,11 @@
 # group chat orchestrator
 
-import json
+import os
 import time
-import uuid
 from copy import deepcopy
 
+import orjson
+
 OUTPUT_FILE = "augmented.json"
 
 # --------------------------------------------------
@@ -43,7 +44,13 @@ CHAT_MESSAGES = [
 # --------------------------------------------------
 # HELPERS
 # --------------------------------------------------
-def make_event(sender, message, timestamp):
+def batch_message_ids(n):
+    # One urandom syscall sliced into 16-byte hex ids instead of a UUID
+    # object construction per message.
+    raw = os.urandom(16 * n)
+    return ["wamid." + raw[i * 16:(i + 1) * 16].hex() for i in range(n)]
+
+def make_event(sender, message, timestamp, message_id):
     return {
         "object": "whatsapp_business_account",
         "entry": [
@@ -64,7 +71,7 @@ def make_event(sender, message, timestamp):
                             "messages": [
                                 {
                                     "from": sender["wa_id"],
-                                    "id": "wamid." + uuid.uuid4().hex,
+                                    "id": message_id,
                                     "timestamp": str(timestamp),
                                     "type": "text",
                                     "text": {
@@ -85,13 +92,15 @@ def make_event(sender, message, timestamp):
 def orchestrate_chat():
     events = []
     base_ts = int(time.time()) - 3600  # start 1 hour ago
+    message_ids = batch_message_ids(len(CHAT_MESSAGES))
 
     for i, text in enumerate(CHAT_MESSAGES):
         sender = PARTICIPANTS[i % len(PARTICIPANTS)]
         event = make_event(
             sender=sender,
             message=text,
-            timestamp=base_ts + (i * 45)
+            timestamp=base_ts + (i * 45),
+            message_id=message_ids[i]
         )
         events.append(event)
 
@@ -103,7 +112,7 @@ def orchestrate_chat():
 if __name__ == "__main__":
     data = orchestrate_chat()
 
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+    with open(OUTPUT_FILE, "wb") as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
 
     print(f"Generated {len(data)} group chat messages in {OUTPUT_FILE}")
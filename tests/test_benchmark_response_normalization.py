@@ -0,0 +1,105 @@
+"""
+Copyright 2024, Zep Software, Inc.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import sys
+from pathlib import Path
+
+import orjson
+import pytest
+
+from graphiti_core.llm_client.config import LLMConfig
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'Benchmark'))
+
+from query_api import CustomOpenAIClient, _normalize  # noqa: E402
+
+
+@pytest.fixture
+def client():
+    return CustomOpenAIClient(
+        config=LLMConfig(api_key='test', base_url='http://localhost:9999/v1')
+    )
+
+
+def _response(data: dict) -> dict:
+    """Wrap a payload the way a dict-based local LLM response carries it."""
+    return {'choices': [{'message': {'content': orjson.dumps(data).decode()}}]}
+
+
+def test_normalize_renames_top_level_aliases():
+    data = _normalize({'entities': [{'entity_name': 'Alice'}], 'facts': []})
+    assert data == {'extracted_entities': [{'name': 'Alice'}], 'edges': []}
+
+
+def test_normalize_skips_alias_when_canonical_present():
+    data = _normalize({'entity_name': 'alias', 'name': 'canonical'})
+    assert data == {'entity_name': 'alias', 'name': 'canonical'}
+
+
+def test_normalize_renames_inside_resolution_duplicates():
+    data = _normalize(
+        {'entity_resolutions': [{'entity_name': 'A', 'duplicates': [{'entity_name': 'B'}]}]}
+    )
+    assert data['entity_resolutions'][0]['name'] == 'A'
+    assert data['entity_resolutions'][0]['duplicates'][0]['name'] == 'B'
+
+
+def test_normalize_leaves_fact_type_untouched():
+    """fact_type is a required EdgeDuplicate response field; the recursive
+    pass must never rename it away."""
+    data = _normalize({'fact_type': 'DEFAULT', 'duplicate_facts': [], 'contradicted_facts': []})
+    assert data['fact_type'] == 'DEFAULT'
+    assert 'relation_type' not in data
+
+
+def test_edge_duplicate_response_is_not_wrapped(client):
+    payload = {'duplicate_facts': [1], 'contradicted_facts': [], 'fact_type': 'DEFAULT'}
+    data = client._handle_structured_response(_response(payload))
+    assert data['fact_type'] == 'DEFAULT'
+    assert 'edges' not in data
+
+
+def test_single_edge_object_is_wrapped_and_relation_type_copied(client):
+    payload = {'fact_type': 'WORKS_AT', 'source_entity_id': None, 'target_entity_id': 2}
+    data = client._handle_structured_response(_response(payload))
+    assert data == {
+        'edges': [
+            {
+                'fact_type': 'WORKS_AT',
+                'relation_type': 'WORKS_AT',
+                'source_entity_id': -1,
+                'target_entity_id': 2,
+            }
+        ]
+    }
+
+
+def test_edges_list_gets_relation_type_copy_and_id_defaults(client):
+    payload = {
+        'edges': [{'fact_type': 'KNOWS', 'source_entity_id': None, 'target_entity_id': None}]
+    }
+    data = client._handle_structured_response(_response(payload))
+    edge = data['edges'][0]
+    assert edge['fact_type'] == 'KNOWS'
+    assert edge['relation_type'] == 'KNOWS'
+    assert edge['source_entity_id'] == -1
+    assert edge['target_entity_id'] == -1
+
+
+def test_bare_resolution_object_is_wrapped(client):
+    payload = {'entity_name': 'A', 'duplicates': []}
+    data = client._handle_structured_response(_response(payload))
+    assert data == {'entity_resolutions': [{'name': 'A', 'duplicates': []}]}